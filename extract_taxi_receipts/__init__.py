@@ -3,10 +3,22 @@
 재사용 목적의 공용 추출 라이브러리.
 """
 
-from .core import extract_from_images, pair_images_from_dir, CoreError
+from .core import (
+    extract_from_images,
+    extract_from_images_many,
+    extract_from_images_batch,
+    aextract_many,
+    aiter_extract,
+    pair_images_from_dir,
+    CoreError,
+)
 
 __all__ = [
     "extract_from_images",
+    "extract_from_images_many",
+    "extract_from_images_batch",
+    "aextract_many",
+    "aiter_extract",
     "pair_images_from_dir",
     "CoreError",
 ] 
\ No newline at end of file
@@ -6,17 +6,33 @@
 
 from __future__ import annotations
 
-import base64
-import json
+import asyncio
+import functools
+import hashlib
+import io
 import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
 
 from dotenv import load_dotenv
-from openai import OpenAI
+import httpx
+from openai import APIConnectionError, APITimeoutError, AsyncOpenAI, InternalServerError, OpenAI, RateLimitError
+import orjson
+from PIL import Image, ImageOps
+import pybase64
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 
 __all__ = [
     "extract_from_images",
+    "extract_from_images_many",
+    "extract_from_images_batch",
+    "aextract_many",
+    "aiter_extract",
     "pair_images_from_dir",
     "CoreError",
 ]
@@ -29,142 +45,766 @@ class CoreError(Exception):
 # ---- 환경 설정 -----------------------------------------------------------
 
 load_dotenv()
-_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+# 동시에 처리할 영수증 쌍 수.
+_CONCURRENCY = int(os.getenv("EXTRACT_CONCURRENCY", "10"))
+
+# keep-alive 커넥션을 재사용해 요청마다 TLS 핸드셰이크를 하지 않도록 한다.
+_HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+_HTTP_TIMEOUT = 60.0
+
+# 쌍 단위 작업용 풀과, 쌍 안에서 앞·뒷면 요청을 나눠 보낼 때 쓰는 풀.
+# 쌍 작업이 같은 풀의 하위 작업을 기다리면 풀이 가득 찼을 때 교착되므로 분리한다.
+_EXECUTOR = ThreadPoolExecutor(max_workers=_CONCURRENCY, thread_name_prefix="extract-pair")
+_REQUEST_EXECUTOR = ThreadPoolExecutor(max_workers=_CONCURRENCY, thread_name_prefix="extract-request")
+
+# 업로드 전 이미지 긴 변 최대 길이(px). 0 이면 원본 그대로 전송.
+_MAX_EDGE = int(os.getenv("RECEIPT_MAX_EDGE", "1600"))
+
+# 1 이면 앞·뒷면을 예전처럼 요청 2개로 나눠 보낸다 (품질 A/B 비교용).
+_SPLIT_REQUESTS = os.getenv("RECEIPT_SPLIT_REQUESTS", "0") == "1"
+
+# Batch API 입력 파일 하나의 최대 크기. OpenAI 한도(200 MB)보다 여유 있게 잡고,
+# 넘으면 파일·작업을 나눠 제출한다.
+_BATCH_FILE_MAX_BYTES = int(os.getenv("EXTRACT_BATCH_FILE_MAX_BYTES", str(100 * 1024 * 1024)))
+
+# Batch 작업 상태 조회가 연달아 이만큼 실패하면 그 작업은 포기한다 (한두 번의 일시 오류로는 멈추지 않음).
+_BATCH_POLL_MAX_ERRORS = 5
+
+# 추출 결과 캐시 위치. 같은 이미지를 다시 처리하면 OpenAI 호출을 건너뛴다.
+_CACHE_DIR = Path(os.getenv("EXTRACT_CACHE_DIR") or Path.home() / ".cache" / "extract_taxi_receipts")
+
+# 인코딩한 이미지(base64) 메모리 캐시의 총 크기 상한. 1600 px JPEG 는 장당 약 0.5 MB,
+# `RECEIPT_MAX_EDGE=0` 이면 원본 크기라 장수로 제한하면 오래 떠 있는 GUI 의 메모리가 커진다.
+_ENCODE_CACHE_MAX_BYTES = int(os.getenv("EXTRACT_ENCODE_CACHE_MB", "32")) * 1024 * 1024
+_ENCODE_CACHE: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_ENCODE_CACHE_BYTES = 0
+_ENCODE_CACHE_LOCK = threading.Lock()
+
+# 디스크 캐시 앞단의 메모리 LRU. 같은 실행 안에서 반복되는 요청은 파일을 읽지 않는다.
+_MEMO: "OrderedDict[str, Dict]" = OrderedDict()
+_MEMO_MAX = 8
+_MEMO_LOCK = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_client() -> OpenAI:
+    """동기 클라이언트. 처음 쓸 때 만든다.
+
+    클라이언트 생성(httpx 풀·SSL 컨텍스트 준비)을 import 시점에서 미뤄
+    GUI·Lambda 의 시작 시간을 줄인다. Files·Batches 호출은 SDK 기본 재시도를 쓰고,
+    `responses.create()` 만 아래 `_retry` 로 재시도한다 (`_create_with_retry` 참고).
+    """
+    return OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=httpx.Client(limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT),
+    )
+
+
+def _new_async_client() -> AsyncOpenAI:
+    """비동기 클라이언트 생성.
+
+    AsyncOpenAI 의 커넥션 풀은 생성된 이벤트 루프에 묶이므로
+    `asyncio.run()` 한 번마다 새로 만든다.
+    """
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=httpx.AsyncClient(limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT),
+    )
 
 
 # ---- 내부 유틸 -----------------------------------------------------------
 
 
+# 3 의 배수 크기로 읽으면 블록마다 패딩 없이 독립적으로 인코딩할 수 있다.
+_B64_CHUNK = 3 * 65536
+
+
 def _b64(path: str | Path) -> str:
-    """이미지 파일을 base64 문자열로 인코딩."""
+    """이미지 파일을 base64 문자열로 인코딩.
+
+    파일 전체를 한 번에 읽지 않고 `_B64_CHUNK` 블록 단위로 읽어 인코딩하므로
+    원본 크기만큼의 임시 버퍼가 생기지 않는다.
+    """
+    out = bytearray()
+    buf = bytearray(_B64_CHUNK)
+    view = memoryview(buf)
     with open(path, "rb") as f:
-        return base64.b64encode(f.read()).decode()
+        while n := f.readinto(buf):
+            out += pybase64.b64encode(view[:n])
+    return out.decode("ascii")
+
+
+def _encode_image_file(path: str) -> str:
+    """이미지를 긴 변 `_MAX_EDGE` px 이하 JPEG(q85)로 다시 압축한 뒤 base64 인코딩.
+
+    폰 카메라 원본은 수 MB 라 업로드·디코딩 시간이 길어지므로 미리 줄인다.
+    이미 충분히 작은 JPEG 이거나 `_MAX_EDGE` 가 0 이면 원본을 그대로 쓴다.
+    """
+
+    if _MAX_EDGE <= 0:
+        return _b64(path)
+
+    with Image.open(path) as im:
+        if im.format == "JPEG" and max(im.size) <= _MAX_EDGE:
+            return _b64(path)
+        # EXIF 회전 정보는 재인코딩 시 사라지므로 픽셀에 먼저 반영
+        im = ImageOps.exif_transpose(im)
+        im.thumbnail((_MAX_EDGE, _MAX_EDGE), Image.LANCZOS)
+        buf = io.BytesIO()
+        im.convert("RGB").save(buf, "JPEG", quality=85, optimize=True)
+
+    return pybase64.b64encode_as_string(buf.getbuffer())
+
+
+def _encode_image(path: str | Path) -> str:
+    """`_encode_image_file` 결과를 (경로, 수정 시각, 크기) 별로 메모리에 캐시해 돌려준다.
+
+    파일이 바뀌지 않았다면 다시 인코딩하지 않는다. 캐시는 문자열 총 길이가
+    `_ENCODE_CACHE_MAX_BYTES` 를 넘지 않도록 오래된 것부터 버린다.
+    """
+    global _ENCODE_CACHE_BYTES
+    st = os.stat(path)
+    key = (str(path), st.st_mtime_ns, st.st_size)
+    with _ENCODE_CACHE_LOCK:
+        data = _ENCODE_CACHE.get(key)
+        if data is not None:
+            _ENCODE_CACHE.move_to_end(key)
+            return data
+
+    data = _encode_image_file(key[0])
+    if len(data) > _ENCODE_CACHE_MAX_BYTES:
+        return data
+    with _ENCODE_CACHE_LOCK:
+        if key not in _ENCODE_CACHE:
+            _ENCODE_CACHE[key] = data
+            _ENCODE_CACHE_BYTES += len(data)
+        while _ENCODE_CACHE_BYTES > _ENCODE_CACHE_MAX_BYTES:
+            _key, old = _ENCODE_CACHE.popitem(last=False)
+            _ENCODE_CACHE_BYTES -= len(old)
+    return data
+
+
+def _cache_key(kwargs: Dict) -> str:
+    """요청 인자(모델·프롬프트·인코딩된 이미지) 의 SHA-256."""
+    return hashlib.sha256(orjson.dumps(kwargs, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def _cache_path(key: str) -> Path:
+    return _CACHE_DIR / f"{key}.json"
+
+
+def _memo_get(key: str) -> Optional[Dict]:
+    with _MEMO_LOCK:
+        data = _MEMO.get(key)
+        if data is not None:
+            _MEMO.move_to_end(key)
+    return None if data is None else dict(data)
+
+
+def _memo_put(key: str, data: Dict) -> None:
+    with _MEMO_LOCK:
+        _MEMO[key] = dict(data)
+        _MEMO.move_to_end(key)
+        while len(_MEMO) > _MEMO_MAX:
+            _MEMO.popitem(last=False)
+
+
+def _cache_load(kwargs: Dict) -> Optional[Dict]:
+    """같은 요청의 이전 추출 결과. 없거나 읽을 수 없으면 None.
+
+    최근 결과는 메모리에서 바로 돌려주고, 없을 때만 디스크 캐시를 읽는다.
+    """
+    key = _cache_key(kwargs)
+    data = _memo_get(key)
+    if data is not None:
+        return data
+    try:
+        data = orjson.loads(_cache_path(key).read_bytes())
+    except (OSError, ValueError):
+        return None
+    _memo_put(key, data)
+    return data
+
+
+def _cache_store(kwargs: Dict, data: Dict) -> None:
+    """추출 결과 저장. 캐시 실패는 추출 결과에 영향을 주지 않는다."""
+    key = _cache_key(kwargs)
+    _memo_put(key, data)
+    path = _cache_path(key)
+    tmp = None
+    try:
+        _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # 같은 키를 여러 스레드가 동시에 저장할 수 있으므로 임시 파일 이름은 호출마다 새로 만든다.
+        with tempfile.NamedTemporaryFile(dir=_CACHE_DIR, prefix=f"{key}.", suffix=".tmp", delete=False) as f:
+            tmp = f.name
+            f.write(orjson.dumps(data))
+        os.replace(tmp, path)
+    except OSError:
+        if tmp is not None:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
 
 
 # ---- OpenAI Vision 호출 --------------------------------------------------
 
 
-def _call_openai(front_img: str | Path, back_img: str | Path | None = None) -> Dict:
-    """단일 영수증(앞·뒤)에서 정보 추출.
+# rate limit·5xx·타임아웃·연결 오류 같은 일시적 오류만 최대 3회까지 지수 백오프로 재시도.
+_retry = retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=1, max=20),
+    retry=retry_if_exception_type((RateLimitError, InternalServerError, APITimeoutError, APIConnectionError)),
+    reraise=True,
+)
 
-    Parameters
-    ----------
-    front_img : str | Path
-        앞면 이미지 경로.
-    back_img : str | Path | None, optional
-        뒷면 이미지 경로. 제공되지 않으면 이름·경로는 빈 문자열로 채움.
+
+@_retry
+def _create_with_retry(**kwargs):
+    """`responses.create()` + 재시도.
+
+    SDK 재시도와 겹쳐 시도 횟수가 곱해지지 않도록 이 호출에서만 SDK 재시도를 끈다.
+    """
+    return _get_client().with_options(max_retries=0).responses.create(**kwargs)
+
+
+@_retry
+async def _acreate_with_retry(client: AsyncOpenAI, **kwargs):
+    """`client.responses.create()` 비동기 버전 + 재시도."""
+    return await client.with_options(max_retries=0).responses.create(**kwargs)
+
+
+def _tool_arguments(res) -> Dict:
+    """응답에서 첫 function_call 의 arguments 를 dict 로 꺼낸다.
+
+    모델이 도구를 부르지 않고 글로 답했거나 arguments 가 JSON 객체가 아니면 `CoreError`.
+    """
+    for item in getattr(res, "output", None) or []:
+        args = getattr(item, "arguments", None)
+        if args is None:
+            continue
+        try:
+            data = orjson.loads(args)
+        except ValueError as e:
+            raise CoreError(f"invalid function call arguments: {e}") from e
+        if not isinstance(data, dict):
+            raise CoreError(f"function call arguments are not an object: {data!r}")
+        return data
+    raise CoreError("no function call in vision response")
+
+
+# ---- Tool Schemas · 프롬프트 ----------------------------------------------
+# 요청마다 다시 만들지 않도록 모듈 로드 시 한 번만 구성한다.
+
+_TOOLS_FRONT = [{
+    "type": "function",
+    "name": "parse_front_taxi_receipt",
+    "description": "Extract key fields from Korean taxi receipts",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "paid_at": {
+                "type": "string",
+                "description": "거래 일시로 적혀있음. 결과는 2025년 이후임. 출력예시: 2025-07-07 23:43"
+            },
+            "fare": {
+                "type": "integer",
+                "description": "총 결제 금액 (원)"
+            },
+        },
+        "required": ["paid_at", "fare"],
+        "additionalProperties": False
+    }
+}]
+
+_TOOLS_BACK = [{
+    "type": "function",
+    "name": "parse_back_taxi_receipt",
+    "description": "Extract key fields from Korean taxi receipts",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "name": {
+                "type": "string",
+                "description": "팀원 이름을 확인해서 이 중에 1명이름을 가져오도록 함. 유사한 이름이 있으면 팀원 이름으로 대체해.  최홍영, 박다혜, 박상현, 김민주, 최윤선, 김익현, 장수현, 이한울, 김호연, 박성진 중 1명임"
+            },
+            "route": {
+                "type": "string",
+                "description": "출발지 - 도착지. example: 회사 - 집 / 집 - 회사 / 야근택시비 / 야근 / 회식 - 집 등등"
+            },
+        },
+        "required": ["name", "route"],
+        "additionalProperties": False
+    }
+}]
+
+_TOOLS_COMBINED = [{
+    "type": "function",
+    "name": "parse_taxi_receipt",
+    "description": "Extract key fields from the front and back of a Korean taxi receipt",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            **_TOOLS_FRONT[0]["parameters"]["properties"],
+            **_TOOLS_BACK[0]["parameters"]["properties"],
+        },
+        "required": ["paid_at", "fare", "name", "route"],
+        "additionalProperties": False
+    }
+}]
+
+_SYS_MSG = {
+    "role": "system",
+    "content": "You are a helpful assistant that extracts structured data from Korean taxi receipts.",
+}
+
+_SYS_MSG_COMBINED = {
+    "role": "system",
+    "content": _SYS_MSG["content"] + " The first image is the front of the receipt, the second is the back.",
+}
+
+_TOOLS_BATCH = [{
+    "type": "function",
+    "name": "parse_taxi_receipts_batch",
+    "description": "Extract key fields from several Korean taxi receipts at once",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "results": {
+                "type": "array",
+                "description": "영수증마다 1개씩, 이미지 번호(index) 순서대로",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "index": {
+                            "type": "integer",
+                            "description": "이미지 번호 i (Image i-front / Image i-back)"
+                        },
+                        "paid_at": {
+                            "type": "string",
+                            "description": "앞면의 거래 일시. 결과는 2025년 이후임. 출력예시: 2025-07-07 23:43"
+                        },
+                        "fare": {
+                            "type": "integer",
+                            "description": "앞면의 총 결제 금액 (원)"
+                        },
+                        "name": {
+                            "type": "string",
+                            "description": "뒷면의 팀원 이름. 유사한 이름이 있으면 팀원 이름으로 대체해.  최홍영, 박다혜, 박상현, 김민주, 최윤선, 김익현, 장수현, 이한울, 김호연, 박성진 중 1명임. 뒷면이 없으면 빈 문자열"
+                        },
+                        "route": {
+                            "type": "string",
+                            "description": "뒷면의 출발지 - 도착지. example: 회사 - 집 / 집 - 회사 / 야근택시비 / 야근 / 회식 - 집 등등. 뒷면이 없으면 빈 문자열"
+                        },
+                    },
+                    "required": ["index", "paid_at", "fare", "name", "route"],
+                    "additionalProperties": False
+                }
+            },
+        },
+        "required": ["results"],
+        "additionalProperties": False
+    }
+}]
+
+_SYS_MSG_BATCH = {
+    "role": "system",
+    "content": (
+        "You are a helpful assistant that extracts structured data from Korean taxi receipts. "
+        "Each receipt i is given as 'Image i-front' and optionally 'Image i-back'. "
+        "Return exactly one result per receipt."
+    ),
+}
+
+
+def _build_requests(front_img: str | Path, back_img: str | Path | None = None) -> Dict[str, Dict]:
+    """단일 영수증(앞·뒤)에 대한 `responses.create()` 인자를 구성.
+
+    뒷면이 있으면 두 이미지를 요청 하나에 함께 담아 왕복 횟수를 절반으로 줄이고,
+    모델이 앞·뒷면을 함께 보고 판단하게 한다. `RECEIPT_SPLIT_REQUESTS=1` 이면
+    예전처럼 앞·뒷면을 따로 요청한다.
 
     Returns
     -------
     dict
-        {paid_at, fare, name, route}
+        {"front+back": kwargs} 또는 {"front": kwargs, "back": kwargs}.
+        뒷면이 없으면 {"front": kwargs} 만 반환.
     """
 
-    # --- Tool Schemas -----------------------------------------------------
-    tools_front = [{
-        "type": "function",
-        "name": "parse_front_taxi_receipt",
-        "description": "Extract key fields from Korean taxi receipts",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "paid_at": {
-                    "type": "string",
-                    "description": "거래 일시로 적혀있음. 결과는 2025년 이후임. 출력예시: 2025-07-07 23:43"
-                },
-                "fare": {
-                    "type": "integer",
-                    "description": "총 결제 금액 (원)"
-                },
-            },
-            "required": ["paid_at", "fare"],
-            "additionalProperties": False
-        }
-    }]
-
-    tools_back = [{
-        "type": "function",
-        "name": "parse_back_taxi_receipt",
-        "description": "Extract key fields from Korean taxi receipts",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "name": {
-                    "type": "string",
-                    "description": "팀원 이름을 확인해서 이 중에 1명이름을 가져오도록 함. 유사한 이름이 있으면 팀원 이름으로 대체해.  최홍영, 박다혜, 박상현, 김민주, 최윤선, 김익현, 장수현, 이한울, 김호연, 박성진 중 1명임"
-                },
-                "route": {
-                    "type": "string",
-                    "description": "출발지 - 도착지. example: 회사 - 집 / 집 - 회사 / 야근택시비 / 야근 / 회식 - 집 등등"
-                },
+    # 앞·뒷면 통합 요청
+    if back_img is not None and not _SPLIT_REQUESTS:
+        input_combined = [
+            _SYS_MSG_COMBINED,
+            {
+                "role": "user",
+                "content": [
+                    {"type": "input_text", "text": "front"},
+                    {
+                        "type": "input_image",
+                        "image_url": f"data:image/jpeg;base64,{_encode_image(front_img)}",
+                    },
+                    {"type": "input_text", "text": "back"},
+                    {
+                        "type": "input_image",
+                        "image_url": f"data:image/jpeg;base64,{_encode_image(back_img)}",
+                    },
+                ],
             },
-            "required": ["name", "route"],
-            "additionalProperties": False
-        }
-    }]
-
-    # --- 프롬프트 구성 ----------------------------------------------------
-    sys_msg = {
-        "role": "system",
-        "content": "You are a helpful assistant that extracts structured data from Korean taxi receipts.",
-    }
+        ]
+        return {"front+back": {"model": "gpt-4o", "input": input_combined, "tools": _TOOLS_COMBINED}}
 
     # 앞면 요청
     input_front = [
-        sys_msg,
+        _SYS_MSG,
         {
             "role": "user",
             "content": [
                 {
                     "type": "input_image",
-                    "image_url": f"data:image/jpeg;base64,{_b64(front_img)}",
+                    "image_url": f"data:image/jpeg;base64,{_encode_image(front_img)}",
                 }
             ],
         },
     ]
+    requests = {"front": {"model": "gpt-4o", "input": input_front, "tools": _TOOLS_FRONT}}
 
     # 뒷면 요청 (optional)
-    input_back = None
     if back_img is not None:
         input_back = [
-            sys_msg,
+            _SYS_MSG,
             {
                 "role": "user",
                 "content": [
                     {
                         "type": "input_image",
-                        "image_url": f"data:image/jpeg;base64,{_b64(back_img)}",
+                        "image_url": f"data:image/jpeg;base64,{_encode_image(back_img)}",
                     }
                 ],
             },
         ]
+        requests["back"] = {"model": "gpt-4o", "input": input_back, "tools": _TOOLS_BACK}
+
+    return requests
+
+
+def _merge_sides(data: Dict[str, Dict]) -> Dict:
+    """요청별 추출 결과를 {paid_at, fare, name, route} 하나로 합친다.
+
+    뒷면이 없으면 이름·경로는 빈 문자열로 남는다.
+    """
+    merged: Dict = {"paid_at": "", "fare": None, "name": "", "route": ""}
+    for part in data.values():
+        merged.update(part)
+    return merged
+
+
+def _call_openai(front_img: str | Path, back_img: str | Path | None = None) -> Dict:
+    """단일 영수증(앞·뒤)에서 정보 추출.
+
+    Parameters
+    ----------
+    front_img : str | Path
+        앞면 이미지 경로.
+    back_img : str | Path | None, optional
+        뒷면 이미지 경로. 제공되지 않으면 이름·경로는 빈 문자열로 채움.
+
+    Returns
+    -------
+    dict
+        {paid_at, fare, name, route}
+    """
+
+    requests = _build_requests(front_img, back_img)
+    data = {side: _cache_load(kwargs) for side, kwargs in requests.items()}
+    pending = [side for side in requests if data[side] is None]
+
+    # 캐시에 없는 요청을 동시에 보낸다. 첫 요청은 현재 스레드에서, 나머지는 풀에서.
+    # (분리 모드면 앞·뒷면 2개라 대기 시간이 절반으로 줄어든다.)
+    futs = {side: _REQUEST_EXECUTOR.submit(_create_with_retry, **requests[side]) for side in pending[1:]}
+    for side in pending:
+        try:
+            res = futs[side].result() if side in futs else _create_with_retry(**requests[side])
+            data[side] = _tool_arguments(res)
+        except Exception as e:
+            raise CoreError(f"OpenAI {side}-page vision call failed: {e}") from e
+        _cache_store(requests[side], data[side])
+
+    return _merge_sides(data)
+
+
+async def _asend_requests(client: AsyncOpenAI, requests: Dict[str, Dict]) -> Dict:
+    """`_build_requests` 로 만든 요청을 비동기로 보내고 합친 결과를 반환.
+
+    `_call_openai` 의 비동기 버전. 요청이 여러 개면 동시에 보낸다.
+    캐시 조회·저장(페이로드 해시 + 디스크 I/O)은 스레드에서 실행해 이벤트 루프를 막지 않는다.
+    """
+
+    cached = await asyncio.gather(*(asyncio.to_thread(_cache_load, kwargs) for kwargs in requests.values()))
+    data = dict(zip(requests, cached))
+    pending = [side for side in requests if data[side] is None]
+    results = await asyncio.gather(
+        *(_acreate_with_retry(client, **requests[side]) for side in pending),
+        return_exceptions=True,
+    )
+
+    for side, res in zip(pending, results):
+        try:
+            if isinstance(res, Exception):
+                raise res
+            data[side] = _tool_arguments(res)
+        except Exception as e:
+            raise CoreError(f"OpenAI {side}-page vision call failed: {e}") from e
+        await asyncio.to_thread(_cache_store, requests[side], data[side])
+
+    return _merge_sides(data)
+
+
+def _build_batch_request(pairs: Sequence[Tuple[str | Path, str | Path | None]]) -> Dict:
+    """여러 영수증(앞·뒤)을 요청 하나에 담는 `responses.create()` 인자를 구성.
+
+    각 이미지 앞에 "Image {i}-front" / "Image {i}-back" 텍스트를 붙여
+    모델이 결과의 `index` 로 영수증을 구분하도록 한다.
+    """
+
+    content: List[Dict] = []
+    for i, (front_img, back_img) in enumerate(pairs):
+        content.append({"type": "input_text", "text": f"Image {i}-front"})
+        content.append({"type": "input_image", "image_url": f"data:image/jpeg;base64,{_encode_image(front_img)}"})
+        if back_img is not None:
+            content.append({"type": "input_text", "text": f"Image {i}-back"})
+            content.append({"type": "input_image", "image_url": f"data:image/jpeg;base64,{_encode_image(back_img)}"})
+
+    return {
+        "model": "gpt-4o",
+        "input": [_SYS_MSG_BATCH, {"role": "user", "content": content}],
+        "tools": _TOOLS_BATCH,
+    }
+
+
+def _call_openai_batch(pairs: Sequence[Tuple[str | Path, str | Path | None]]) -> List[Dict | Exception]:
+    """여러 영수증을 요청 한 번으로 추출해 입력 순서대로 결과를 반환.
+
+    이미지를 읽지 못한 쌍과 응답에서 빠졌거나 필드가 모자란 영수증은 그 자리에,
+    요청 자체가 실패하면 요청에 담긴 모든 쌍의 자리에 `CoreError` 가 들어간다.
+    """
+
+    results: List[Dict | Exception | None] = [None] * len(pairs)
+
+    # 이미지를 먼저 인코딩(`_ENCODE_CACHE` 에 남음)해 보고, 읽지 못한 쌍만 빼고 요청한다.
+    sent: List[int] = []
+    for i, (front_img, back_img) in enumerate(pairs):
+        try:
+            _encode_image(front_img)
+            if back_img is not None:
+                _encode_image(back_img)
+        except Exception as e:
+            results[i] = CoreError(f"Failed to read receipt images {front_img}: {e}")
+        else:
+            sent.append(i)
+    if not sent:
+        return results
+
+    def _fail_sent(msg: str) -> List[Dict | Exception]:
+        for i in sent:
+            results[i] = CoreError(msg)
+        return results
 
     try:
-        res_front = _client.responses.create(
-            model="gpt-4o",
-            input=input_front,
-            tools=tools_front,
-        )
+        request = _build_batch_request([pairs[i] for i in sent])
     except Exception as e:
-        raise CoreError(f"OpenAI front-page vision call failed: {e}") from e
+        return _fail_sent(f"Failed to build batch request: {e}")
 
-    data_front = json.loads(res_front.output[0].arguments)
+    parsed = _cache_load(request)
+    if parsed is None:
+        try:
+            res = _create_with_retry(**request)
+        except Exception as e:
+            return _fail_sent(f"OpenAI batch vision call failed: {e}")
+        try:
+            parsed = _tool_arguments(res)
+        except CoreError as e:
+            return _fail_sent(f"Unexpected batch vision response: {e}")
+        if not isinstance(parsed.get("results"), list):
+            return _fail_sent(f"Batch vision response has no results list: {parsed!r}")
+        _cache_store(request, parsed)
+
+    # 요청 안의 index 는 sent 안에서의 순번이다.
+    by_index = {
+        r["index"]: r for r in parsed.get("results", [])
+        if isinstance(r, dict) and isinstance(r.get("index"), int)
+    }
+    for j, i in enumerate(sent):
+        r = by_index.get(j)
+        if r is None:
+            results[i] = CoreError(f"Receipt {i} missing from batch response")
+            continue
+        missing = [k for k in ("paid_at", "fare", "name", "route") if k not in r]
+        if missing:
+            results[i] = CoreError(f"Receipt {i} batch result is missing {', '.join(missing)}")
+            continue
+        data = {k: r[k] for k in ("paid_at", "fare", "name", "route")}
+        if pairs[i][1] is None:
+            data.update(name="", route="")
+        results[i] = data
+    return results
+
+
+def _parse_batch_output(text: bytes) -> Dict[str, Dict | Exception]:
+    """Batch 결과(JSONL) 를 `custom_id → 추출 dict 또는 CoreError` 로 변환.
+
+    줄마다 따로 해석하므로 이상한 줄은 그 `custom_id` 자리만 `CoreError` 가 된다.
+    어느 요청인지 알 수 없는 줄은 건너뛴다 (호출부에서 결과 없음으로 처리).
+    """
 
-    # back page is optional
-    data_back: Dict = {"name": "", "route": ""}
-    if input_back is not None:
+    out: Dict[str, Dict | Exception] = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
         try:
-            res_back = _client.responses.create(
-                model="gpt-4o",
-                input=input_back,
-                tools=tools_back,
+            item = orjson.loads(line)
+            custom_id = item["custom_id"]
+        except (ValueError, KeyError, TypeError):
+            continue
+        try:
+            res = item.get("response") or {}
+            if item.get("error") or res.get("status_code") != 200:
+                err = item.get("error") or (res.get("body") or {}).get("error") or res.get("status_code")
+                out[custom_id] = CoreError(str(err))
+                continue
+            # 첫 출력이 function_call 이 아닐 수도 있으므로 arguments 가 있는 항목을 찾는다.
+            args = next((o["arguments"] for o in res["body"]["output"] if isinstance(o, dict) and "arguments" in o), None)
+            if args is None:
+                out[custom_id] = CoreError("no function call in batch output")
+                continue
+            out[custom_id] = orjson.loads(args)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            out[custom_id] = CoreError(f"unexpected batch output line: {e!r}")
+    return out
+
+
+def _run_batch_job(
+    pairs: Sequence[Tuple[str | Path, str | Path | None]], poll_interval: float = 30.0
+) -> List[Dict | Exception]:
+    """OpenAI Batch API(`/v1/batches`) 로 모든 쌍을 제출하고 완료될 때까지 폴링.
+
+    `_build_requests` 의 요청마다 `custom_id = "pair-{i}-{side}"` 를 붙여 JSONL 로 올린다.
+    입력 파일 크기 제한을 넘지 않도록 `_BATCH_FILE_MAX_BYTES` 마다 파일·작업을 나눠 제출하고,
+    결과를 다시 쌍 단위로 합쳐 입력 순서대로 반환한다. 제출한 작업 id 와 진행 상태는 stdout 에 출력한다.
+    상태 조회가 일시적으로 실패해도 폴링을 계속하고, `_BATCH_POLL_MAX_ERRORS` 번 연달아 실패한 작업만 포기한다.
+    이미지를 읽지 못한 쌍이나 실패한 작업에 담긴 쌍은 그 자리에 `CoreError` 가 들어간다.
+    """
+
+    sides: List[Dict[str, str] | Exception] = []
+    bodies: Dict[str, Dict] = {}
+    outputs: Dict[str, Dict | Exception] = {}
+    chunks: List[List[Tuple[str, bytes]]] = [[]]
+    chunk_bytes = 0
+    for i, (front_img, back_img) in enumerate(pairs):
+        try:
+            requests = _build_requests(front_img, back_img)
+        except Exception as e:
+            sides.append(CoreError(f"Failed to read receipt images {front_img}: {e}"))
+            continue
+        sides.append({side: f"pair-{i}-{side}" for side in requests})
+        for side, body in requests.items():
+            custom_id = f"pair-{i}-{side}"
+            cached = _cache_load(body)
+            if cached is not None:
+                outputs[custom_id] = cached
+                continue
+            bodies[custom_id] = body
+            line = orjson.dumps({"custom_id": custom_id, "method": "POST", "url": "/v1/responses", "body": body})
+            if chunks[-1] and chunk_bytes + len(line) + 1 > _BATCH_FILE_MAX_BYTES:
+                chunks.append([])
+                chunk_bytes = 0
+            chunks[-1].append((custom_id, line))
+            chunk_bytes += len(line) + 1
+
+    # 파일마다 작업 하나. 모두 먼저 제출하고 함께 폴링한다.
+    # 작업 id 를 출력해 두면 실행이 끊겨도 나중에 결과를 직접 받아 올 수 있다.
+    jobs: List[Tuple[object, List[str]]] = []
+    client = _get_client() if bodies else None
+    for chunk in chunks:
+        if not chunk:
+            continue
+        ids = [custom_id for custom_id, _line in chunk]
+        try:
+            batch_file = client.files.create(
+                file=("requests.jsonl", b"\n".join(line for _id, line in chunk)),
+                purpose="batch",
+            )
+            job = client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/responses",
+                completion_window="24h",
             )
-            data_back = json.loads(res_back.output[0].arguments)
         except Exception as e:
-            raise CoreError(f"OpenAI back-page vision call failed: {e}") from e
-
-    return {**data_front, **data_back}
+            outputs.update((custom_id, CoreError(f"OpenAI batch job failed: {e}")) for custom_id in ids)
+            continue
+        print(f"Submitted batch job {job.id} ({len(ids)} requests)", flush=True)
+        jobs.append((job, ids))
+
+    pending = list(range(len(jobs)))
+    errors = [0] * len(jobs)  # 작업별 연속 조회 실패 횟수
+    last_seen: List[Optional[Tuple]] = [None] * len(jobs)
+    while pending:
+        time.sleep(poll_interval)
+        for n in list(pending):
+            job, ids = jobs[n]
+            try:
+                job = client.batches.retrieve(job.id)
+            except Exception as e:
+                # 서버에서는 작업이 계속 돌고 있으므로 일시 오류면 다음 주기에 다시 조회한다.
+                errors[n] += 1
+                if errors[n] < _BATCH_POLL_MAX_ERRORS:
+                    print(f"Batch job {job.id}: status check failed ({e}), retrying", flush=True)
+                    continue
+                msg = f"gave up polling OpenAI batch job {job.id} (it may still be running): {e}"
+                outputs.update((custom_id, CoreError(msg)) for custom_id in ids)
+                pending.remove(n)
+                continue
+            errors[n] = 0
+            jobs[n] = (job, ids)
+            counts = getattr(job, "request_counts", None)
+            seen = (job.status, getattr(counts, "completed", None), getattr(counts, "failed", None))
+            if seen != last_seen[n]:
+                last_seen[n] = seen
+                progress = f" ({counts.completed}/{counts.total} done, {counts.failed} failed)" if counts else ""
+                print(f"Batch job {job.id}: {job.status}{progress}", flush=True)
+            if job.status in ("completed", "failed", "expired", "cancelled"):
+                pending.remove(n)
+                try:
+                    fetched: Dict[str, Dict | Exception] = {}
+                    for file_id in (job.output_file_id, job.error_file_id):
+                        if file_id:
+                            fetched.update(_parse_batch_output(client.files.content(file_id).content))
+                except Exception as e:
+                    outputs.update((custom_id, CoreError(f"OpenAI batch job {job.id} failed: {e}")) for custom_id in ids)
+                    continue
+                for custom_id in ids:
+                    res = fetched.get(custom_id)
+                    if res is None:
+                        res = CoreError(f"no output in batch job {job.id} (status {job.status})")
+                    elif not isinstance(res, Exception):
+                        _cache_store(bodies[custom_id], res)
+                    outputs[custom_id] = res
+
+    results: List[Dict | Exception] = []
+    for pair_sides in sides:
+        if isinstance(pair_sides, Exception):
+            results.append(pair_sides)
+            continue
+        data: Dict[str, Dict] = {}
+        for side, custom_id in pair_sides.items():
+            res = outputs.get(custom_id, CoreError("no output in batch job"))
+            if isinstance(res, Exception):
+                results.append(CoreError(f"OpenAI {side}-page batch request failed: {res}"))
+                break
+            data[side] = res
+        else:
+            results.append(_merge_sides(data))
+    return results
 
 
 # ---- Public API ----------------------------------------------------------
@@ -180,14 +820,136 @@ def extract_from_images(front_path: str | Path, back_path: str | Path | None = N
     return _call_openai(front_path, back_path)
 
 
+def extract_from_images_many(
+    pairs: Sequence[Tuple[str | Path, str | Path | None]],
+) -> Iterator[Tuple[int, Dict | Exception]]:
+    """여러 영수증 쌍을 스레드 풀에서 동시에 추출하며 끝나는 순서대로 `(index, 결과)` 를 내보낸다.
+
+    이벤트 루프 없이 쓸 수 있는 `aiter_extract` 의 동기 버전.
+    동시 처리 수는 `EXTRACT_CONCURRENCY` (기본 10) 로 정한다.
+    실패한 쌍은 결과 자리에 예외 객체가 들어가며, 중간에 순회를 멈추면
+    아직 시작하지 않은 작업은 취소된다.
+    """
+
+    futs = {_EXECUTOR.submit(_call_openai, f, b): i for i, (f, b) in enumerate(pairs)}
+    try:
+        for fut in as_completed(futs):
+            try:
+                result = fut.result()
+            except Exception as e:
+                result = e
+            yield futs[fut], result
+    finally:
+        for fut in futs:
+            fut.cancel()
+
+
+def extract_from_images_batch(
+    pairs: Sequence[Tuple[str | Path, str | Path | None]],
+    mode: str = "inline",
+    batch_size: int = 10,
+    poll_interval: float = 30.0,
+) -> List[Dict | Exception]:
+    """여러 영수증을 묶어서 추출한다.
+
+    mode
+        - ``"inline"``: `batch_size` 쌍씩 요청 하나로 보낸다.
+          N 쌍이면 OpenAI 호출이 ceil(N / batch_size) 회로 줄어든다.
+        - ``"batch"``: OpenAI Batch API 로 제출(요청 파일이 크면 여러 작업으로 나눔)하고
+          `poll_interval` 초마다 상태를 확인한다. 완료까지 최대 24시간 걸릴 수 있지만 비용이 낮다.
+
+    입력 순서대로 결과를 반환하며, 실패한 쌍은 결과 자리에 `CoreError` 가 들어간다.
+    """
+
+    if mode == "batch":
+        return _run_batch_job(pairs, poll_interval)
+    if mode != "inline":
+        raise ValueError(f"unknown batch mode: {mode!r}")
+
+    results: List[Dict | Exception] = []
+    for start in range(0, len(pairs), batch_size):
+        results.extend(_call_openai_batch(pairs[start:start + batch_size]))
+    return results
+
+
+async def aiter_extract(
+    pairs: Sequence[Tuple[str | Path, str | Path | None]], concurrency: int = _CONCURRENCY
+) -> AsyncIterator[Tuple[int, Dict | Exception]]:
+    """여러 영수증 쌍을 동시에 추출하며 끝나는 순서대로 `(index, 결과)` 를 내보낸다.
+
+    이미지 인코딩(CPU)과 OpenAI 응답 대기(네트워크)가 겹치도록 2단계로 처리한다.
+    인코딩 작업자(CPU 코어 수)가 스레드에서 요청을 만들어 크기가 제한된 큐에 넣고,
+    요청 작업자 `concurrency` 개가 꺼내서 보낸다.
+
+    실패한 쌍은 결과 자리에 예외 객체(대개 `CoreError`)가 들어간다.
+    중간에 순회를 멈추면 남은 작업은 취소된다.
+    """
+
+    todo: asyncio.Queue = asyncio.Queue()
+    for item in enumerate(pairs):
+        todo.put_nowait(item)
+    # 인코딩이 요청보다 너무 앞서 나가 메모리에 쌓이지 않도록 크기를 제한
+    encoded: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    done: asyncio.Queue = asyncio.Queue()
+
+    async def _encoder():
+        while not todo.empty():
+            idx, (front, back) = todo.get_nowait()
+            try:
+                requests = await asyncio.to_thread(_build_requests, front, back)
+            except Exception as e:
+                await done.put((idx, e))
+                continue
+            await encoded.put((idx, requests))
+
+    async with _new_async_client() as client:
+
+        async def _sender():
+            while True:
+                idx, requests = await encoded.get()
+                try:
+                    result = await _asend_requests(client, requests)
+                except Exception as e:
+                    result = e
+                await done.put((idx, result))
+
+        n_encoders = min(os.cpu_count() or 1, len(pairs))
+        workers = [asyncio.create_task(_encoder()) for _ in range(n_encoders)]
+        workers += [asyncio.create_task(_sender()) for _ in range(concurrency)]
+        try:
+            for _ in range(len(pairs)):
+                yield await done.get()
+        finally:
+            for t in workers:
+                t.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def aextract_many(
+    pairs: Sequence[Tuple[str | Path, str | Path | None]], concurrency: int = _CONCURRENCY
+) -> List[Dict | Exception]:
+    """여러 영수증 쌍을 동시에 추출해 입력 순서대로 결과 리스트를 반환한다.
+
+    실패한 쌍은 결과 자리에 예외 객체가 들어간다. (`aiter_extract` 참고)
+    """
+
+    results: List[Dict | Exception] = [None] * len(pairs)  # type: ignore[list-item]
+    async for idx, result in aiter_extract(pairs, concurrency):
+        results[idx] = result
+    return results
+
+
 def pair_images_from_dir(image_dir: str | Path) -> List[Tuple[str, str]]:
     """디렉터리 안의 이미지 파일을 이름순으로 정렬한 뒤 (앞, 뒤) 쌍으로 묶는다.
 
     홀수 개의 파일이 있을 경우 마지막 이미지는 무시한다.
-    지원 확장자: .jpg, .jpeg, .png
+    지원 확장자: .jpg, .jpeg, .png (같은 이름의 디렉터리는 제외)
     """
 
-    p = Path(image_dir)
-    imgs = sorted([str(f) for f in p.iterdir() if f.suffix.lower() in (".jpg", ".jpeg", ".png")])
-    n = len(imgs) // 2 * 2  # 짝수 개수 유지
-    return [(imgs[i], imgs[i + 1]) for i in range(0, n, 2)] 
\ No newline at end of file
+    # os.scandir 는 DirEntry 에 이름·타입 정보를 담아 주므로 Path 객체를 만들지 않아도 된다.
+    with os.scandir(image_dir) as it:
+        imgs = sorted(
+            e.path for e in it
+            if e.name.lower().endswith((".jpg", ".jpeg", ".png")) and e.is_file()
+        )
+    return list(zip(imgs[0::2], imgs[1::2]))  # 홀수면 마지막 1장은 zip 에서 버려짐
@@ -1,50 +1,84 @@
 
+import argparse
+import asyncio
+import csv
 import os
 import sys
 import datetime as dt
-from pathlib import Path
-from typing import List, Tuple, Dict
-import pandas as pd
+from typing import Dict, List, Optional, Tuple
 from extract_taxi_receipts import (
-    extract_from_images,
+    aextract_many,
+    extract_from_images_batch,
     pair_images_from_dir,
-    CoreError,
 )
 
 # ---------------------------------------------------------------------------
 # CLI entry point – minimal wrapper around shared core layer
 # ---------------------------------------------------------------------------
 
-def process_directory(image_dir: str = "./img") -> str:
-    """Scan `image_dir`, pair images, extract data, and save to CSV."""
+def process_directory(image_dir: str = "./img", mode: Optional[str] = None) -> str:
+    """Scan `image_dir`, pair images, extract data, and save to CSV.
+
+    `mode` selects a batched path instead of one request per image:
+    "inline" sends several receipts per Vision request, "batch" submits
+    everything to the OpenAI Batch API (split into several jobs when the
+    request file would be too large) and waits for it.
+    """
 
     rows: List[Dict] = []
 
-    for front, back in pair_images_from_dir(image_dir):
-        try:
-            data = extract_from_images(front, back)
-            rows.append(data)
-            print(f"✓ Parsed {os.path.basename(front)} → {data}")
-        except CoreError as e:
-            print(f"✗ Failed on {front}: {e}")
+    pairs = pair_images_from_dir(image_dir)
+    if mode is not None:
+        results = extract_from_images_batch(pairs, mode=mode)
+    else:
+        results = asyncio.run(aextract_many(pairs))
+
+    for (front, _back), data in zip(pairs, results):
+        if isinstance(data, Exception):
+            print(f"✗ Failed on {front}: {data}")
+            continue
+        rows.append(data)
+        print(f"✓ Parsed {os.path.basename(front)} → {data}")
 
-    df = pd.DataFrame(rows)
-    if not df.empty:
-        # Ensure consistent column order
-        ordered_cols = ["paid_at", "name", "route", "fare"]
-        df = df[ordered_cols]
+    # Ensure consistent column order
+    ordered_cols = ["paid_at", "name", "route", "fare"]
 
     ts = dt.datetime.now().strftime("%Y%m%d_%H%M")
     out_path = f"receipts_{ts}.csv"
-    df.to_csv(out_path, index=False, encoding="utf-8-sig")
-    print(f"\nSaved {len(df)} rows → {out_path}")
+    with open(out_path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=ordered_cols, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"\nSaved {len(rows)} rows → {out_path}")
     return out_path
 
 
 if __name__ == "__main__":
-    target_dir = sys.argv[1] if len(sys.argv) >= 2 else "./img"
-    if not Path(target_dir).exists():
-        print(f"Directory not found: {target_dir}")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Extract taxi receipt images in a folder to CSV.")
+    parser.add_argument("image_dir", nargs="?", default="./img")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--inline",
+        dest="mode",
+        action="store_const",
+        const="inline",
+        help="send up to 10 receipts per Vision request",
+    )
+    group.add_argument(
+        "--batch",
+        dest="mode",
+        action="store_const",
+        const="batch",
+        help="submit all receipts via the OpenAI Batch API (cheaper, up to 24h)",
+    )
+    args = parser.parse_args()
 
-    process_directory(target_dir)
\ No newline at end of file
+    # A missing or unreadable folder surfaces from the scan itself; only errors
+    # about the folder are reported here, anything else keeps its traceback.
+    try:
+        process_directory(args.image_dir, mode=args.mode)
+    except OSError as e:
+        if e.filename != args.image_dir:
+            raise
+        print(f"Cannot read directory: {args.image_dir} ({e.strerror})")
+        sys.exit(1)
\ No newline at end of file
@@ -10,8 +10,10 @@ from PyQt5.QtWidgets import (
     QPlainTextEdit,
     QLabel,
 )
-from PyQt5.QtCore import QThread, pyqtSignal
+from PyQt5.QtCore import QThread, QTimer, pyqtSignal
+import csv
 import sys, os
+import threading
 
 # -- 백그라운드 작업 쓰레드 ----------------------------------------------
 
@@ -21,26 +23,57 @@ class ExtractWorker(QThread):
     error = pyqtSignal(str)
     cancelled = pyqtSignal()
     progress = pyqtSignal(int)  # 0~100
-    log = pyqtSignal(str)       # 로그 메시지
+    log = pyqtSignal(str)       # 로그 메시지 (여러 줄을 묶어서 방출)
+
+    # 줄마다 신호를 보내면 QPlainTextEdit 가 매번 다시 그리므로
+    # 이 줄 수가 모이거나 타이머 간격(초)이 지날 때마다 모아서 한 번에 보낸다.
+    LOG_FLUSH_LINES = 20
+    LOG_FLUSH_SEC = 0.25
 
     def __init__(self, folder: str):
         super().__init__()
         self.folder = folder
         self._abort = False
+        self._log_buf = []
+        self._log_lock = threading.Lock()
+
+        # 작업 쓰레드는 이벤트 루프가 없으므로 타이머는 GUI 쓰레드에서 돈다.
+        # 다음 로그 줄이 한참 뒤에 와도 버퍼가 LOG_FLUSH_SEC 이상 묵지 않는다.
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setInterval(int(self.LOG_FLUSH_SEC * 1000))
+        self._flush_timer.timeout.connect(self._flush_log)
+        self.started.connect(self._flush_timer.start)
+        for sig in (self.finished, self.error, self.cancelled):
+            sig.connect(self._flush_timer.stop)
 
     def stop(self):
         """작업 중단 요청."""
         self._abort = True
 
+    def _log(self, msg: str):
+        """로그 한 줄을 버퍼에 쌓고, 충분히 모였으면 바로 방출 (나머지는 타이머가 방출)."""
+        with self._log_lock:
+            self._log_buf.append(msg)
+            full = len(self._log_buf) >= self.LOG_FLUSH_LINES
+        if full:
+            self._flush_log()
+
+    def _flush_log(self):
+        """버퍼에 남은 로그를 한 블록으로 방출. 작업 쓰레드와 타이머(GUI 쓰레드) 양쪽에서 불린다."""
+        # 양쪽 방출 순서가 뒤섞이지 않도록 잠근 채로 방출
+        with self._log_lock:
+            if self._log_buf:
+                self.log.emit("\n".join(self._log_buf))
+                self._log_buf.clear()
+
     def run(self):
         """이미지 추출을 진행하며 진행률 신호를 방출."""
 
         try:
             from extract_taxi_receipts import (
-                extract_from_images,
+                extract_from_images_many,
                 pair_images_from_dir,
             )
-            import pandas as pd
             import datetime as dt
             import os
 
@@ -49,36 +82,45 @@ class ExtractWorker(QThread):
             if total == 0:
                 raise RuntimeError("선택한 폴더에 처리할 이미지가 없습니다.")
 
-            rows = []
-            self.log.emit(f"총 {total}개 이미지 쌍 처리 시작…")
-            self.log.emit(f"----- 진행 로그 [이미지 파일명 → 추출된 데이터] -------")
-            for idx, (front, back) in enumerate(pairs, 1):
-                if self._abort:
-                    self.log.emit("[사용자 중단] 작업이 취소되었습니다.")
-                    self.cancelled.emit()
-                    return
-                try:
-                    data = extract_from_images(front, back)
-                    rows.append(data)
-                    self.log.emit(f"✓ Parsed [{os.path.basename(front)} & {os.path.basename(back)}] → {data}")
-                except Exception as e:  # CoreError 포함
-                    self.log.emit(f"✗ Failed on {os.path.basename(front)}: {e}")
-                # 진행률 계산
-                self.progress.emit(int(idx / total * 100))
-
-            df = pd.DataFrame(rows)
-            if not df.empty:
-                ordered_cols = ["paid_at", "name", "route", "fare"]
-                df = df[ordered_cols]
-
+            results = [None] * total  # 쌍 순서 유지
+            self._log(f"총 {total}개 이미지 쌍 처리 시작…")
+            self._log(f"----- 진행 로그 [이미지 파일명 → 추출된 데이터] -------")
+            jobs = extract_from_images_many(pairs)
+            try:
+                for done, (idx, data) in enumerate(jobs, 1):
+                    if self._abort:
+                        self._log("[사용자 중단] 작업이 취소되었습니다.")
+                        self._flush_log()
+                        self.cancelled.emit()
+                        return
+                    front, back = pairs[idx]
+                    if isinstance(data, Exception):  # CoreError 포함
+                        self._log(f"✗ Failed on {os.path.basename(front)}: {data}")
+                    else:
+                        results[idx] = data
+                        self._log(f"✓ Parsed [{os.path.basename(front)} & {os.path.basename(back)}] → {data}")
+                    # 진행률 계산
+                    self.progress.emit(int(done / total * 100))
+            finally:
+                jobs.close()  # 남은 작업 취소
+
+            rows = [r for r in results if r is not None]
+
+            ordered_cols = ["paid_at", "name", "route", "fare"]
             ts = dt.datetime.now().strftime("%Y%m%d_%H%M")
             out_path = os.path.join(os.getcwd(), f"receipts_{ts}.csv")
-            df.to_csv(out_path, index=False, encoding="utf-8-sig")
-            self.log.emit(f"Saved {len(df)} rows → {out_path}")
+            with open(out_path, "w", newline="", encoding="utf-8-sig") as f:
+                writer = csv.DictWriter(f, fieldnames=ordered_cols, extrasaction="ignore")
+                writer.writeheader()
+                writer.writerows(rows)
+            self._log(f"Saved {len(rows)} rows → {out_path}")
+
+            self._flush_log()
 
             if not self._abort:
                 self.finished.emit(out_path)
         except Exception as e:
+            self._flush_log()
             self.error.emit(str(e))
 
 
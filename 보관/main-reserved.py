@@ -1,126 +1,261 @@
 
-import os, sys, json, base64, datetime as dt
-import pandas as pd
-from typing import List, Dict, Tuple
+import os, sys, csv, mmap, base64, asyncio, hashlib, functools, tempfile, datetime as dt
+import orjson
+from io import BytesIO
+from PIL import Image, ImageOps
+from typing import List, Dict, Tuple, Optional
 from pathlib import Path
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, APIConnectionError, APITimeoutError, InternalServerError, NotFoundError, RateLimitError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
 
 # 1) 환경 변수에서 API 키 읽기
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Files·Batches 호출은 SDK 기본 재시도를 쓰고, responses.create 만 아래 create_response 가 재시도
+aclient = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+# 비전 모델 (기본값은 저렴한 gpt-4o-mini, 정확도가 부족하면 OPENAI_MODEL=gpt-4o)
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+# 동시에 진행할 영수증 수 (TPM/RPM 한도 보호)
+sem = asyncio.Semaphore(16)
+
+# 추출 결과 캐시 폴더 (앞·뒷면 내용 해시별 JSON)
+CACHE_DIR = Path(".cache")
+
+# 1 이면 이미지를 Files API 로 한 번만 올리고 file_id 로 참조, 기본(0)은 base64 data URL 로 전송.
+# 올린 영수증 사진(팀원 이름 포함)은 계정 Files 저장소에 남으므로, 다 쓰면
+# `python main-reserved.py --delete-uploads` 로 지운다 (.cache/file_ids.json 에 기록된 파일 전부 삭제).
+UPLOAD_IMAGES = os.getenv("RECEIPT_UPLOAD_IMAGES", "0") == "1"
+FILE_IDS_PATH = CACHE_DIR / "file_ids.json"
 
 # 2) 이미지 → Base64 인코딩
+# 업로드 전 긴 변 최대 길이(px) · JPEG 품질 (비전 토큰은 타일 수에 비례)
+MAX_EDGE = 1536
+JPEG_QUALITY = 80
+
+def resized_jpeg(path: str, mtime: int, size: int) -> str:
+    """긴 변 MAX_EDGE 로 줄인 JPEG 경로. (경로, 수정시각, 크기, 리사이즈 설정) 별로 .cache/resized 에 보관"""
+    key = hashlib.blake2b(f"{path}|{mtime}|{size}|{MAX_EDGE}|{JPEG_QUALITY}".encode(), digest_size=16).hexdigest()
+    out = CACHE_DIR / "resized" / f"{key}.jpg"
+    if out.exists():
+        return str(out)
+    with Image.open(path) as im:
+        # 이미 작은 JPEG 는 그대로 사용
+        if max(im.size) <= MAX_EDGE and im.format == "JPEG":
+            return path
+        im = ImageOps.exif_transpose(im)  # 재인코딩하면 EXIF 회전 정보가 사라지므로 먼저 적용
+        im.thumbnail((MAX_EDGE, MAX_EDGE), Image.LANCZOS)
+        buf = BytesIO()
+        im.convert("RGB").save(buf, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    # asyncio.to_thread 로 여러 스레드가 같은 사진을 동시에 줄일 수 있어 임시 파일 이름은 호출마다 새로
+    with tempfile.NamedTemporaryFile(dir=out.parent, suffix=".tmp", delete=False) as f:
+        f.write(buf.getvalue())
+    os.replace(f.name, out)
+    return str(out)
+
+@functools.lru_cache(maxsize=512)
+def _b64_cached(path: str, mtime: int, size: int) -> str:
+    path = resized_jpeg(path, mtime, size)
+    size = os.path.getsize(path)
+    # mmap 으로 파일을 메모리에 읽어 들이지 않고 바로 인코딩 (raw bytes 사본 없음)
+    with open(path, "rb") as f:
+        if size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return base64.b64encode(mm).decode("ascii")
+
 def b64(path: str) -> str:
+    # 파일이 그대로면 (경로, 수정시각, 크기) 가 같으므로 다시 인코딩하지 않음
+    st = os.stat(path)
+    return _b64_cached(path, st.st_mtime_ns, st.st_size)
+
+@functools.lru_cache(maxsize=512)
+def _file_key_cached(path: str, mtime: int, size: int) -> str:
     with open(path, "rb") as f:
-        return base64.b64encode(f.read()).decode()
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
 
-# 3) Vision-Chat 호출
-def call_openai(front_img: str, back_img: str = None) -> Dict:
-    """단일 영수증(앞·뒤)에서 정보 추출 → dict 반환"""
-    
-    print(front_img)
-    # front_img="./img/KakaoTalk_20250711_132102437.jpg"
+def cache_file(front_img: str, back_img: str) -> Path:
+    """(모델·프롬프트·스키마 해시, 앞·뒷면 파일 내용 해시) → 결과 캐시 경로"""
+    keys = [REQUEST_KEY]
+    for p in (front_img, back_img):
+        st = os.stat(p)
+        keys.append(_file_key_cached(p, st.st_mtime_ns, st.st_size))
+    return CACHE_DIR / f"{'_'.join(keys)}.json"
 
+def load_cached(front_img: str, back_img: str) -> Optional[Dict]:
+    try:
+        return orjson.loads(cache_file(front_img, back_img).read_bytes())
+    except (OSError, ValueError):
+        return None
 
-    """앞면 Tool calling = 거래일시와 전체금액""" 
-    tools_front = [{
-        "type": "function",
-        "name": "parse_front_taxi_receipt",
-        "description": "Extract key fields from Korean taxi receipts",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "paid_at": {
-                    "type": "string",
-                    "description": "거래 일시로 적혀있음. 결과는 2025년 이후임. 출력예시: 2025-07-07 23:43"
-                },
-                "fare": {
-                    "type": "integer",
-                    "description": "총 결제 금액 (원)"
-                },
+def save_cached(front_img: str, back_img: str, data: Dict) -> None:
+    CACHE_DIR.mkdir(exist_ok=True)
+    cache_file(front_img, back_img).write_bytes(orjson.dumps(data))
+
+# 3) Vision-Chat 호출
+# Tool calling = 앞면(거래일시·전체금액) + 뒷면(팀원 이름·출발지와 도착지)
+TOOLS_COMBINED = [{
+    "type": "function",
+    "name": "parse_taxi_receipt",
+    "description": "Extract key fields from Korean taxi receipts",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "paid_at": {
+                "type": "string",
+                "description": "거래 일시로 적혀있음. 결과는 2025년 이후임. 출력예시: 2025-07-07 23:43"
             },
-            "required": ["paid_at", "fare"],
-            "additionalProperties": False
-        }
-    }]
-    """뒷면 Tool calling = 출발지와 도착지"""
-    tools_back = [{
-        "type": "function",
-        "name": "parse_back_taxi_receipt",
-        "description": "Extract key fields from Korean taxi receipts",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "name": {
-                    "type": "string",
-                    "description": "팀원 이름임. 최홍영, 박다혜, 박상현, 김민주, 최윤선, 김익현, 장수현, 이한울, 김호연, 박성진 중 1명임"
-                },
-                "route": {
-                    "type": "string",
-                    "description": "출발지 - 도착지. example: 회사 - 집 / 집 - 회사 / 야근택시비 / 야근 / 회식 - 집 등등"
-                },
+            "fare": {
+                "type": "integer",
+                "description": "총 결제 금액 (원)"
             },
-            "required": ["name", "route"],
-            "additionalProperties": False
-        }
-    }]
-
-    # 앞장 이미지 인풋
-    input_front=[
-            {
-                "role": "system",
-                "content": "You are a helpful assistant that extracts structured data from Korean taxi receipts."
+            "name": {
+                "type": "string",
+                "description": "팀원 이름임. 최홍영, 박다혜, 박상현, 김민주, 최윤선, 김익현, 장수현, 이한울, 김호연, 박성진 중 1명임"
             },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "input_image",
-                        "image_url": f"data:image/jpeg;base64,{b64(front_img)}"
-                    }
-                ]
+            "route": {
+                "type": "string",
+                "description": "출발지 - 도착지. example: 회사 - 집 / 집 - 회사 / 야근택시비 / 야근 / 회식 - 집 등등"
             },
-        ]      
-    
-    # 뒷장 이미지 인풋
-    input_back=[
+        },
+        "required": ["paid_at", "fare", "name", "route"],
+        "additionalProperties": False
+    }
+}]
+
+SYSTEM_PROMPT = (
+    "You are a helpful assistant that extracts structured data from Korean taxi receipts. "
+    "The first image is the front of the receipt (paid_at, fare), "
+    "the second image is the back (name, route)."
+)
+
+# 결과 캐시 키에 들어가는 요청 설정. 모델·프롬프트·스키마·리사이즈 설정이 바뀌면 캐시를 따로 쓴다
+# (OPENAI_MODEL 을 바꿔 A/B 비교할 때 이전 모델 결과가 재사용되지 않도록)
+REQUEST_KEY = hashlib.blake2b(orjson.dumps(
+    {"model": OPENAI_MODEL, "system": SYSTEM_PROMPT, "tools": TOOLS_COMBINED,
+     "max_edge": MAX_EDGE, "quality": JPEG_QUALITY},
+    option=orjson.OPT_SORT_KEYS,
+), digest_size=8).hexdigest()
+
+def load_file_ids() -> Dict[str, str]:
+    try:
+        return orjson.loads(FILE_IDS_PATH.read_bytes())
+    except (OSError, ValueError):
+        return {}
+
+def save_file_ids() -> None:
+    CACHE_DIR.mkdir(exist_ok=True)
+    tmp = FILE_IDS_PATH.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_bytes(orjson.dumps(file_ids))
+    os.replace(tmp, FILE_IDS_PATH)
+
+# 업로드한 이미지 내용 해시 → file_id (실행 간 유지)
+file_ids: Dict[str, str] = load_file_ids()
+# 이번 실행에서 서버에 아직 있는지 확인한 file_id
+verified_ids: set = set()
+# 내용 해시별 업로드 잠금. 같은 사진을 담은 영수증이 동시에 올려 id 가 덮어써지지 않게 함
+upload_locks: Dict[str, asyncio.Lock] = {}
+
+async def file_exists(file_id: str) -> bool:
+    """서버에서 삭제·만료된 file_id 인지 확인 (실행마다 id 당 한 번)"""
+    if file_id in verified_ids:
+        return True
+    try:
+        await aclient.files.retrieve(file_id)
+    except NotFoundError:
+        return False
+    verified_ids.add(file_id)
+    return True
+
+def resized_and_key(path: str) -> Tuple[str, str]:
+    """(줄인 JPEG 경로, 그 내용 해시)"""
+    st = os.stat(path)
+    small = resized_jpeg(path, st.st_mtime_ns, st.st_size)
+    st = os.stat(small)
+    return small, _file_key_cached(small, st.st_mtime_ns, st.st_size)
+
+async def image_part(path: str) -> Dict:
+    """input_image 항목. 같은 내용은 한 번만 업로드하고 file_id 를 재사용"""
+    # 디코딩·리사이즈·해시는 CPU/디스크 작업이라 이벤트 루프를 막지 않게 스레드에서 실행
+    if not UPLOAD_IMAGES:
+        return {"type": "input_image", "image_url": f"data:image/jpeg;base64,{await asyncio.to_thread(b64, path)}"}
+    small, key = await asyncio.to_thread(resized_and_key, path)
+    async with upload_locks.setdefault(key, asyncio.Lock()):
+        # 기록된 id 가 서버에서 사라졌으면 버리고 다시 올림
+        if key in file_ids and not await file_exists(file_ids[key]):
+            del file_ids[key]
+            save_file_ids()
+        if key not in file_ids:
+            data = await asyncio.to_thread(Path(small).read_bytes)
+            uploaded = await aclient.files.create(file=(f"{key}.jpg", data, "image/jpeg"), purpose="vision")
+            file_ids[key] = uploaded.id
+            verified_ids.add(uploaded.id)
+            save_file_ids()
+        return {"type": "input_image", "file_id": file_ids[key]}
+
+async def build_request(front_img: str, back_img: str = None) -> Dict:
+    """앞·뒷면 이미지를 한 번에 보내는 Responses API 요청 본문"""
+    front_part, back_part = await asyncio.gather(image_part(front_img), image_part(back_img))
+
+    # 앞·뒷장 이미지 인풋 (첫 번째 = 앞면, 두 번째 = 뒷면)
+    input_combined=[
         {
             "role": "system",
-            "content": "You are a helpful assistant that extracts structured data from Korean taxi receipts."
+            "content": SYSTEM_PROMPT
         },
         {
             "role": "user",
-            "content": [
-                {
-                    "type": "input_image",
-                    "image_url": f"data:image/jpeg;base64,{b64(back_img)}"
-                }
-            ]
+            "content": [front_part, back_part]
         },
     ]
 
-    response_front = client.responses.create(
-        model="gpt-4o",
-        input=input_front,
-        tools=tools_front
-    )
-    response_back = client.responses.create(
-        model="gpt-4o",
-        input=input_back,
-        tools=tools_back
-    )
+    return {"model": OPENAI_MODEL, "input": input_combined, "tools": TOOLS_COMBINED}
+
+
+_backoff = wait_random_exponential(min=1, max=30)
+
+def wait_retry_after(retry_state) -> float:
+    """서버가 Retry-After 를 주면 그만큼, 아니면 지수 백오프 + 지터"""
+    exc = retry_state.outcome.exception()
+    try:
+        return min(float(exc.response.headers["retry-after"]), 60.0)
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return _backoff(retry_state)
+
+# 429·5xx·타임아웃·연결 오류만 재시도 (400 같은 요청 오류는 바로 실패)
+@retry(
+    wait=wait_retry_after,
+    stop=stop_after_attempt(6),
+    retry=retry_if_exception_type((RateLimitError, InternalServerError, APITimeoutError, APIConnectionError)),
+    reraise=True,
+)
+async def create_response(**kwargs):
+    # SDK 재시도와 겹치지 않게 이 호출만 SDK 재시도를 끔
+    return await aclient.with_options(max_retries=0).responses.create(**kwargs)
+
+
+async def call_openai(front_img: str, back_img: str = None) -> Dict:
+    """단일 영수증(앞·뒤)에서 정보 추출 → dict 반환"""
+
+    print(front_img)
+    # front_img="./img/KakaoTalk_20250711_132102437.jpg"
+
+    # 이전 실행에서 처리한 영수증이면 API 호출 생략 (파일 해시는 스레드에서)
+    cached = await asyncio.to_thread(load_cached, front_img, back_img)
+    if cached is not None:
+        return cached
 
-    print(response_front)
-    print(response_back)
+    # 앞·뒷면을 요청 1개로 보냄 (재시도 대기 중에도 sem 을 쥐고 있어 한도를 넘지 않음)
+    async with sem:
+        response = await create_response(**(await build_request(front_img, back_img)))
+
+    print(response)
 
     # 함수 호출 결과(JSON str)가 arguments 에 담겨 있음
-    # 새로운 API 응답 구조에 맞게 수정
-    data_front = json.loads(response_front.output[0].arguments)
-    data_back = json.loads(response_back.output[0].arguments)
-    
-    # front와 back 결과를 하나의 딕셔너리로 합치기
-    combined_data = {**data_front, **data_back}
+    combined_data = orjson.loads(response.output[0].arguments)
+    await asyncio.to_thread(save_cached, front_img, back_img, combined_data)
     return combined_data
 
 
@@ -131,41 +266,245 @@ def pair_images_from_dir(image_dir: str) -> List[Tuple[str, str]]:
       순서대로 2개씩 (앞면, 뒷면) 튜플 리스트로 반환한다.
     • 파일 개수가 홀수라면 마지막 하나는 무시한다.
     """
-    p = Path(image_dir)
-    imgs = sorted([str(f) for f in p.iterdir() if f.suffix.lower() in (".jpg", ".jpeg", ".png")])
-    # 짝수 개수만 유지
-    n = len(imgs) // 2 * 2
-    return [(imgs[i], imgs[i + 1]) for i in range(0, n, 2)]
+    # os.scandir 는 DirEntry 에 이름·파일 종류를 담아 주므로 항목마다 stat 하지 않음
+    with os.scandir(image_dir) as it:
+        imgs = sorted(
+            e.path for e in it
+            if e.name.lower().endswith((".jpg", ".jpeg", ".png")) and e.is_file()
+        )
+    # 홀수 개면 zip 이 마지막 하나를 버림
+    return list(zip(imgs[0::2], imgs[1::2]))
+
+
+# CSV 컬럼 순서: 일자, name, route, fare
+COLUMNS = ['paid_at', 'name', 'route', 'fare']
+
+# 이미지 폴더별 처리 완료 목록 + 이어 쓸 CSV 파일명.
+# --resume 으로 실행하면 중단된 실행의 CSV 에 남은 영수증만 이어서 기록하고,
+# 폴더의 영수증을 모두 기록하면 그 폴더 항목은 지워진다.
+MANIFEST_PATH = Path("processed.json")
+
+def pair_key(front_img: str, back_img: str) -> str:
+    return f"{os.path.abspath(front_img)}|{os.path.abspath(back_img)}"
+
+def _read_manifests() -> Dict:
+    try:
+        data = orjson.loads(MANIFEST_PATH.read_bytes())
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def load_manifest(image_dir: str, resume: bool) -> Dict:
+    """image_dir 의 진행 상태. resume 이 아니거나 기록이 없으면 새 CSV 로 시작"""
+    if resume:
+        try:
+            m = _read_manifests()[os.path.abspath(image_dir)]
+            return {"out_file": m["out_file"], "processed": set(m["processed"])}
+        except (KeyError, TypeError):
+            pass
+    ts = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
+    return {"out_file": f"receipts_{ts}.csv", "processed": set()}
+
+def save_manifest(image_dir: str, manifest: Optional[Dict]) -> None:
+    """image_dir 항목 기록 (None 이면 항목 삭제). 다른 폴더 항목은 그대로 둠"""
+    data = _read_manifests()
+    key = os.path.abspath(image_dir)
+    if manifest is None:
+        data.pop(key, None)
+    else:
+        data[key] = {"out_file": manifest["out_file"], "processed": sorted(manifest["processed"])}
+    if not data:
+        MANIFEST_PATH.unlink(missing_ok=True)
+        return
+    tmp = MANIFEST_PATH.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_bytes(orjson.dumps(data))
+    os.replace(tmp, MANIFEST_PATH)
+
+def finish_manifest(image_dir: str, manifest: Dict, all_pairs: List[Tuple[str, str]]) -> None:
+    """폴더의 영수증을 모두 기록했으면 항목을 지워 다음 실행은 새로 시작"""
+    if all(pair_key(f, b) in manifest["processed"] for f, b in all_pairs):
+        save_manifest(image_dir, None)
+    else:
+        print("일부 영수증이 실패했습니다. --resume 을 붙여 다시 실행하면 남은 것만 처리합니다.")
+
+def open_csv(out_file: str):
+    """이어 쓰기 모드로 열고, 새 파일일 때만 헤더 기록 → (파일, writer)"""
+    new = not os.path.exists(out_file) or os.path.getsize(out_file) == 0
+    fh = open(out_file, "a", encoding="utf-8-sig", newline="")
+    writer = csv.DictWriter(fh, fieldnames=COLUMNS, extrasaction="ignore")
+    if new:
+        writer.writeheader()
+    return fh, writer
+
+async def parse_pair(front_img: str, back_img: str) -> Tuple[str, object]:
+    """(앞면 경로, 결과 dict 또는 예외) — 완료 순서대로 받아도 어떤 영수증인지 알 수 있게"""
+    try:
+        return front_img, await call_openai(front_img, back_img)
+    except Exception as e:
+        return front_img, e
+
+
+async def main(image_dir: str = "./img", resume: bool = False):
+    manifest = load_manifest(image_dir, resume)
+    out_file = manifest["out_file"]
+    # 이어서 실행하면 이전 실행에서 CSV 에 기록한 영수증은 건너뜀
+    all_pairs = pair_images_from_dir(image_dir)
+    pairs = [(f, b) for f, b in all_pairs if pair_key(f, b) not in manifest["processed"]]
+    back_of = dict(pairs)
+    n = 0
+    # 끝나는 영수증부터 바로 한 줄씩 기록 (중간에 죽어도 부분 CSV 가 남음)
+    fh, writer = open_csv(out_file)
+    with fh:
+        # 모든 영수증을 한꺼번에 요청 (동시 개수는 sem 이 제한)
+        for fut in asyncio.as_completed([parse_pair(f, b) for f, b in pairs]):
+            front, info = await fut
+            if isinstance(info, Exception):
+                print(f"✗ Failed on {front}: {info}")
+                continue
+            writer.writerow(info)
+            fh.flush()
+            manifest["processed"].add(pair_key(front, back_of[front]))
+            save_manifest(image_dir, manifest)
+            n += 1
+            print(f"✓ Parsed {os.path.basename(front)} → {info}")
+
+    finish_manifest(image_dir, manifest, all_pairs)
+    print(f"\nSaved {n} rows → {out_file}")
 
 
-def main(image_dir: str = "./img"):
-    rows = []
-    for front, back in pair_images_from_dir(image_dir):
+# 5) Batch API 메인
+def parse_batch_lines(content: bytes) -> Dict[str, object]:
+    """Batch 결과/오류 JSONL → custom_id 별 결과 dict 또는 예외 (이상한 줄은 그 영수증만 실패)"""
+    out: Dict[str, object] = {}
+    for line in content.splitlines():
+        try:
+            item = orjson.loads(line)
+            custom_id = item["custom_id"]
+        except (ValueError, KeyError, TypeError):
+            continue  # 어느 영수증인지 모르는 줄은 무시 (그 영수증은 결과 없음으로 처리)
         try:
-            info = call_openai(front, back)
-            rows.append(info)
+            res = item.get("response") or {}
+            if item.get("error") or res.get("status_code") != 200:
+                reason = item.get("error") or (res.get("body") or {}).get("error") or res.get("status_code")
+                out[custom_id] = RuntimeError(f"batch request failed: {reason}")
+                continue
+            args = next((o["arguments"] for o in res["body"]["output"] if "arguments" in o), None)
+            out[custom_id] = orjson.loads(args) if args is not None else RuntimeError("no function call in batch output")
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            out[custom_id] = RuntimeError(f"unexpected batch output: {e!r}")
+    return out
+
+
+# Batch 입력 파일 하나의 최대 크기 (OpenAI 한도 200 MB 보다 여유 있게). 넘으면 파일·작업을 나눠 제출
+BATCH_FILE_MAX_BYTES = 100 * 1024 * 1024
+
+async def run_batch(pairs: List[Tuple[str, str]], todo: List[int], poll_sec: int) -> Dict[str, object]:
+    """pairs[i] (i ∈ todo) 요청을 JSONL 로 묶어 Batch API 로 제출 → custom_id 별 결과 dict 또는 예외"""
+
+    # 영수증 i 의 요청을 custom_id "i" 로 기록 (파일로 쓰지 않고 메모리에서 바로 업로드)
+    # base64 이미지가 든 요청은 한 줄이 수백 KB 라 BATCH_FILE_MAX_BYTES 마다 나눔
+    chunks: List[List[Tuple[int, bytes]]] = [[]]
+    size = 0
+    for i in todo:
+        front, back = pairs[i]
+        line = orjson.dumps({"custom_id": str(i), "method": "POST", "url": "/v1/responses", "body": await build_request(front, back)})
+        if chunks[-1] and size + len(line) + 1 > BATCH_FILE_MAX_BYTES:
+            chunks.append([])
+            size = 0
+        chunks[-1].append((i, line))
+        size += len(line) + 1
+
+    # 모두 제출한 뒤 함께 대기
+    batches = []
+    for chunk in chunks:
+        batch_file = await aclient.files.create(file=("requests.jsonl", b"\n".join(l for _, l in chunk)), purpose="batch")
+        batch = await aclient.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/responses",
+            completion_window="24h",
+        )
+        print(f"Submitted batch {batch.id} ({len(chunk)} receipts)")
+        batches.append((batch, [i for i, _ in chunk]))
+
+    parts: Dict[str, object] = {}
+    for batch, ids in batches:
+        # 완료될 때까지 대기
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            await asyncio.sleep(poll_sec)
+            batch = await aclient.batches.retrieve(batch.id)
+            print(f"… {batch.id} {batch.status}")
+
+        # custom_id 별 결과. 실패한 요청의 이유는 error_file 에 있음
+        # (completed 가 아니어도 끝난 요청의 결과는 받아 둠)
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                output = await aclient.files.content(file_id)
+                parts.update(parse_batch_lines(output.content))
+        for i in ids:
+            parts.setdefault(str(i), RuntimeError(f"no result in batch {batch.id} (status {batch.status})"))
+    return parts
+
+
+async def main_batch(image_dir: str = "./img", poll_sec: int = 30, resume: bool = False):
+    """캐시에 없는 영수증만 Batch API 로 제출 → 완료되면 CSV 저장"""
+    manifest = load_manifest(image_dir, resume)
+    out_file = manifest["out_file"]
+    all_pairs = pair_images_from_dir(image_dir)
+    pairs = [(f, b) for f, b in all_pairs if pair_key(f, b) not in manifest["processed"]]
+    loaded = await asyncio.gather(*[asyncio.to_thread(load_cached, f, b) for f, b in pairs])
+    cached = dict(enumerate(loaded))
+    todo = [i for i, c in cached.items() if c is None]
+    parts = await run_batch(pairs, todo, poll_sec) if todo else {}
+
+    n = 0
+    fh, writer = open_csv(out_file)
+    with fh:
+        for i, (front, back) in enumerate(pairs):
+            info = cached[i]
+            if info is None:
+                info = parts[str(i)]
+                if isinstance(info, Exception):
+                    print(f"✗ Failed on {front}: {info}")
+                    continue
+                save_cached(front, back, info)
+            writer.writerow(info)
+            fh.flush()
+            manifest["processed"].add(pair_key(front, back))
+            save_manifest(image_dir, manifest)
+            n += 1
             print(f"✓ Parsed {os.path.basename(front)} → {info}")
-        except Exception as e:
-            print(f"✗ Failed on {front}: {e}")
-
-    # 원하는 컬럼 순서로 DataFrame 생성
-    df = pd.DataFrame(rows)
-    if len(df) > 0:
-        # 컬럼 순서 지정: 일자, name, route, fare
-        column_order = ['paid_at', 'name', 'route', 'fare']
-        df = df[column_order]
-    
-    ts = dt.datetime.now().strftime("%Y%m%d_%H%M")
-    out_file = f"receipts_{ts}.csv"
-    df.to_csv(out_file, index=False, encoding="utf-8-sig")
-    # 또는 Excel 저장: df.to_excel(out_file.replace(".csv",".xlsx"), index=False)
-    print(f"\nSaved {len(df)} rows → {out_file}")
+
+    finish_manifest(image_dir, manifest, all_pairs)
+    print(f"\nSaved {n} rows → {out_file}")
+
+
+async def delete_uploads():
+    """.cache/file_ids.json 에 기록된 업로드 이미지를 계정에서 모두 삭제"""
+    for key, file_id in list(file_ids.items()):
+        try:
+            await aclient.files.delete(file_id)
+        except NotFoundError:
+            pass  # 이미 삭제·만료됨
+        del file_ids[key]
+        save_file_ids()
+        print(f"Deleted {file_id}")
 
 
 if __name__ == "__main__":
     # 이미지 디렉터리 경로를 인자로 받을 수 있으며, 생략하면 기본으로 ./img 사용
-    dir_path = sys.argv[1] if len(sys.argv) >= 2 else "./img"
+    # --batch 를 붙이면 Batch API 로 한꺼번에 제출 (50% 저렴, 최대 24시간 소요)
+    # --delete-uploads 는 RECEIPT_UPLOAD_IMAGES=1 로 올린 이미지를 계정에서 지우고 끝냄
+    if "--delete-uploads" in sys.argv[1:]:
+        asyncio.run(delete_uploads())
+        sys.exit(0)
+    # --resume 을 붙이면 같은 폴더의 중단된 실행을 이어서 처리 (processed.json)
+    args = [a for a in sys.argv[1:] if a not in ("--batch", "--resume")]
+    dir_path = args[0] if args else "./img"
+    resume = "--resume" in sys.argv[1:]
     if not Path(dir_path).exists():
         print(f"Directory not found: {dir_path}")
         sys.exit(1)
-    main(dir_path)
\ No newline at end of file
+    if "--batch" in sys.argv[1:]:
+        asyncio.run(main_batch(dir_path, resume=resume))
+    else:
+        asyncio.run(main(dir_path, resume=resume))
\ No newline at end of file